@@ -3,32 +3,58 @@ Streamlit UI for Pinecone Vector Database Querying
 Interactive interface to query the article embeddings.
 """
 
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from types import SimpleNamespace
+import cachetools
+import httpx
+import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
 from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
+from pinecone import ServerlessSpec
+from similarity import cosine_topk
+from vector_db import (
+    ARTICLE_IDS,
+    ARTICLES,
+    DIMENSION,
+    HTTP_LIMITS,
+    INDEX_NAME,
+    METRIC,
+    UPSERT_POOL_THREADS,
+    Pinecone,
+    embed_articles,
+    embed_texts_async,
+    generate_embeddings,
+    index_exists,
+    upsert_in_batches,
+    wait_for_vectors,
+)
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize session state
 if "index_initialized" not in st.session_state:
     st.session_state.index_initialized = False
 if "index" not in st.session_state:
     st.session_state.index = None
-if "pc" not in st.session_state:
-    st.session_state.pc = None
-
-INDEX_NAME = "article-index"
-DIMENSION = 1536
-METRIC = "cosine"
+if "openai_client" not in st.session_state:
+    st.session_state.openai_client = None
+if "local_matrix" not in st.session_state:
+    st.session_state.local_matrix = None
+if "restore_attempted" not in st.session_state:
+    st.session_state.restore_attempted = False
 
-ARTICLES = [
-    "AI is revolutionizing industries by enabling automation and improving efficiency.",
-    "Quantum computing promises to solve complex problems that classical computers cannot.",
-    "The future of blockchain technology includes decentralized finance and enhanced security."
-]
+LOCAL_SEARCH_THRESHOLD = 10_000
+QUERY_EMBED_TIMEOUT = 30  # seconds to wait on another session's embedding
 
 
 @st.cache_resource
@@ -50,15 +76,19 @@ def get_openai_client():
     if not api_key:
         st.error("OPENAI_API_KEY not found in environment variables")
         return None
-    return OpenAI(api_key=api_key)
+    return OpenAI(
+        api_key=api_key,
+        http_client=httpx.Client(
+            http2=True,
+            limits=HTTP_LIMITS
+        )
+    )
 
 
 def create_or_get_index(pc: Pinecone):
     """Create or get existing Pinecone index."""
-    existing_indexes = [index.name for index in pc.list_indexes()]
-    
-    if INDEX_NAME in existing_indexes:
-        return pc.Index(INDEX_NAME)
+    if index_exists(pc):
+        return pc.Index(INDEX_NAME, pool_threads=UPSERT_POOL_THREADS)
     
     # Create index
     pc.create_index(
@@ -72,23 +102,87 @@ def create_or_get_index(pc: Pinecone):
     )
     
     # Wait for index to be ready
-    import time
-    while INDEX_NAME not in [index.name for index in pc.list_indexes()]:
-        time.sleep(1)
+    while not pc.describe_index(INDEX_NAME).status['ready']:
+        time.sleep(0.25)
     
-    return pc.Index(INDEX_NAME)
+    return pc.Index(INDEX_NAME, pool_threads=UPSERT_POOL_THREADS)
 
 
-def generate_embeddings(openai_client, texts):
-    """Generate embeddings using OpenAI."""
-    embeddings = []
-    for text in texts:
-        response = openai_client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
-        )
-        embeddings.append(response.data[0].embedding)
-    return embeddings
+@st.cache_resource
+def get_query_embedding_cache():
+    """Process-wide TTL cache of query embeddings, shared by all sessions."""
+    # The dict holds futures for in-flight embeddings so concurrent misses share one call
+    return cachetools.TTLCache(maxsize=4096, ttl=3600), {}, threading.Lock()
+
+
+def embed_query(openai_client, text_norm):
+    """Embed a normalized query, reusing embeddings across sessions."""
+    cache, in_flight, lock = get_query_embedding_cache()
+    key = hashlib.sha256(text_norm.encode("utf-8")).hexdigest()
+    with lock:
+        embedding = cache.get(key)
+        if embedding is not None:
+            return embedding
+        future = in_flight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = in_flight[key] = Future()
+    
+    # Another session is already embedding this query; wait for its result,
+    # or embed it ourselves if that takes too long
+    if not is_owner:
+        try:
+            return future.result(timeout=QUERY_EMBED_TIMEOUT)
+        except FutureTimeoutError:
+            pass
+        except Exception:
+            raise
+        except BaseException as e:
+            # Only the owner's interruption (e.g. a rerun) falls back; ours propagates
+            if not future.done() or future.exception() is not e:
+                raise
+        return generate_embeddings(openai_client, [text_norm])[0]
+    
+    try:
+        embedding = generate_embeddings(openai_client, [text_norm])[0]
+        with lock:
+            cache[key] = embedding
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(embedding)
+    finally:
+        with lock:
+            in_flight.pop(key, None)
+    return embedding
+
+
+@st.cache_data(ttl=60)
+def get_vector_count(_index, index_name=INDEX_NAME):
+    """Return the number of vectors in the index, cached briefly across reruns."""
+    return _index.describe_index_stats().total_vector_count
+
+
+def restore_existing_index():
+    """Reuse an index already populated by a previous session."""
+    # Opportunistic: missing keys and errors are left for the Initialize button to report
+    if not os.getenv("PINECONE_API_KEY") or not os.getenv("OPENAI_API_KEY"):
+        return
+    
+    try:
+        pc = initialize_pinecone()
+        openai_client = get_openai_client()
+        if not index_exists(pc):
+            return
+        
+        index = pc.Index(INDEX_NAME, pool_threads=UPSERT_POOL_THREADS)
+        if get_vector_count(index, INDEX_NAME) >= len(ARTICLES):
+            st.session_state.index = index
+            st.session_state.openai_client = openai_client
+            st.session_state.index_initialized = True
+    except Exception:
+        logger.warning("Could not restore existing index '%s'", INDEX_NAME, exc_info=True)
 
 
 def initialize_index_with_data():
@@ -107,49 +201,80 @@ def initialize_index_with_data():
         # Get or create index
         index = create_or_get_index(pc)
         
-        # Check if index already has data
-        stats = index.describe_index_stats()
-        if stats.total_vector_count == 0:
-            # Generate embeddings
-            embeddings = generate_embeddings(openai_client, ARTICLES)
+        # Check live stats; the cached count may predate a delete made elsewhere
+        if index.describe_index_stats().total_vector_count == 0:
+            # Load precomputed or cached embeddings, falling back to OpenAI
+            embeddings = embed_articles(lambda texts: asyncio.run(
+                embed_texts_async(openai_client.api_key, texts)
+            ))
             
             # Insert embeddings
-            vectors = []
-            for i, (article, embedding) in enumerate(zip(ARTICLES, embeddings)):
-                vectors.append({
-                    "id": f"article-{i}",
-                    "values": embedding,
-                    "metadata": {"text": article}
-                })
+            vectors = [
+                {"id": id_, "values": e.tolist(), "metadata": {"text": a}}
+                for id_, a, e in zip(ARTICLE_IDS, ARTICLES, embeddings)
+            ]
             
-            index.upsert(vectors=vectors)
+            upsert_in_batches(index, vectors)
             
             # Wait for indexing
-            import time
-            time.sleep(2)
+            wait_for_vectors(index, len(vectors))
+        get_vector_count.clear()
         
-        st.session_state.pc = pc
         st.session_state.index = index
+        st.session_state.openai_client = openai_client
         st.session_state.index_initialized = True
         st.success("Index initialized and articles inserted!")
 
 
+def build_local_matrix(embeddings):
+    """Stack embeddings into a row-normalized float32 matrix for local search."""
+    matrix = np.vstack(embeddings).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def can_search_locally():
+    """Whether the index is small and holds exactly ARTICLES, so it can be searched in memory."""
+    vector_count = get_vector_count(st.session_state.index, INDEX_NAME)
+    return vector_count < LOCAL_SEARCH_THRESHOLD and vector_count == len(ARTICLES)
+
+
+def query_local(query_embedding, top_k):
+    """Brute-force search over the in-memory articles, shaped like a Pinecone response."""
+    top, scores = cosine_topk(st.session_state.local_matrix, query_embedding, top_k)
+    return SimpleNamespace(matches=iter_local_matches(top, scores))
+
+
+def iter_local_matches(top, scores):
+    """Yield formatted matches one at a time so rows can render as they arrive."""
+    for i, score in zip(top, scores):
+        yield SimpleNamespace(id=ARTICLE_IDS[i], score=float(score), metadata={"text": ARTICLES[i]})
+
+
 def query_index(query_text, top_k=3):
     """Query the index for closest matches."""
-    if not st.session_state.index or not st.session_state.pc:
+    if not st.session_state.index:
         st.error("Index not initialized. Please initialize first.")
         return None
     
-    openai_client = get_openai_client()
-    if not openai_client:
-        return None
+    openai_client = st.session_state.openai_client
+    
+    # Generate query embedding (cached on normalized text)
+    text_norm = " ".join(query_text.lower().split())
+    query_embedding = embed_query(openai_client, text_norm)
     
-    # Generate query embedding
-    query_embedding = generate_embeddings(openai_client, [query_text])[0]
+    # Small corpora are searched locally, skipping the Pinecone round-trip
+    if can_search_locally():
+        if st.session_state.local_matrix is None:
+            embeddings = embed_articles(lambda texts: asyncio.run(
+                embed_texts_async(openai_client.api_key, texts)
+            ))
+            st.session_state.local_matrix = build_local_matrix(embeddings)
+        return query_local(query_embedding, top_k)
     
     # Query Pinecone
     results = st.session_state.index.query(
-        vector=query_embedding,
+        vector=query_embedding.tolist(),
         top_k=top_k,
         include_metadata=True
     )
@@ -168,6 +293,11 @@ def main():
     st.title("🔍 Pinecone Vector Database Query Interface")
     st.markdown("Query article embeddings using semantic search")
     
+    # Pick up an index populated by a previous session, once per session
+    if not st.session_state.restore_attempted:
+        st.session_state.restore_attempted = True
+        restore_existing_index()
+    
     # Initialize index
     if st.button("Initialize Index & Insert Articles", type="primary"):
         initialize_index_with_data()
@@ -196,24 +326,29 @@ def main():
     
     if st.button("Search", type="primary"):
         if query:
+            # Reserve a slot per result so rows paint as soon as each match arrives
+            header_placeholder = st.empty()
+            row_placeholders = [st.empty() for _ in range(top_k)]
+            
             with st.spinner("Searching..."):
                 results = query_index(query, top_k=top_k)
-                
-                if results:
+            
+            if results:
+                with header_placeholder.container():
                     st.divider()
                     st.header("Search Results")
-                    
-                    for i, match in enumerate(results.matches, 1):
-                        with st.container():
-                            col1, col2 = st.columns([1, 4])
-                            with col1:
-                                st.metric("Score", f"{match.score:.4f}")
-                            with col2:
-                                st.markdown(f"**Article ID:** `{match.id}`")
-                                st.markdown(f"**Text:** {match.metadata.get('text', 'N/A')}")
-                            st.divider()
-                else:
-                    st.error("No results found or error occurred.")
+                
+                for placeholder, match in zip(row_placeholders, results.matches):
+                    with placeholder.container():
+                        col1, col2 = st.columns([1, 4])
+                        with col1:
+                            st.metric("Score", f"{match.score:.4f}")
+                        with col2:
+                            st.markdown(f"**Article ID:** `{match.id}`")
+                            st.markdown(f"**Text:** {match.metadata.get('text', 'N/A')}")
+                        st.divider()
+            else:
+                header_placeholder.error("No results found or error occurred.")
         else:
             st.warning("Please enter a query.")
     
@@ -222,13 +357,15 @@ def main():
     # Cleanup section
     st.header("Index Management")
     if st.button("🗑️ Delete Index", type="secondary"):
-        if st.session_state.pc:
+        pc = initialize_pinecone()
+        if pc:
             try:
-                st.session_state.pc.delete_index(INDEX_NAME)
+                pc.delete_index(INDEX_NAME)
+                get_vector_count.clear()
                 st.success(f"Index '{INDEX_NAME}' deleted successfully!")
                 st.session_state.index_initialized = False
                 st.session_state.index = None
-                st.session_state.pc = None
+                st.session_state.local_matrix = None
                 st.rerun()
             except Exception as e:
                 st.error(f"Error deleting index: {e}")
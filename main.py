@@ -3,28 +3,42 @@ Pinecone Vector Database Implementation
 This script sets up a Pinecone index, inserts article embeddings, and queries for closest matches.
 """
 
+import asyncio
 import os
 import sys
+import time
+import httpx
 from dotenv import load_dotenv
 from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
+from pinecone import ServerlessSpec
+from vector_db import (
+    ARTICLE_IDS,
+    ARTICLES,
+    DIMENSION,
+    HTTP_LIMITS,
+    INDEX_NAME,
+    METRIC,
+    UPSERT_POOL_THREADS,
+    Pinecone,
+    embed_articles,
+    embed_texts_async,
+    generate_embeddings,
+    index_exists,
+    upsert_in_batches,
+    wait_for_vectors,
+)
 
 # Load environment variables
 load_dotenv()
 
 # Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Articles to be embedded
-ARTICLES = [
-    "AI is revolutionizing industries by enabling automation and improving efficiency.",
-    "Quantum computing promises to solve complex problems that classical computers cannot.",
-    "The future of blockchain technology includes decentralized finance and enhanced security."
-]
-
-INDEX_NAME = "article-index"
-DIMENSION = 1536  # OpenAI text-embedding-ada-002 dimension
-METRIC = "cosine"
+openai_client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.Client(
+        http2=True,
+        limits=HTTP_LIMITS
+    )
+)
 
 
 def initialize_pinecone():
@@ -39,11 +53,9 @@ def initialize_pinecone():
 
 def create_index(pc: Pinecone):
     """Create a new Pinecone index if it doesn't exist."""
-    existing_indexes = [index.name for index in pc.list_indexes()]
-    
-    if INDEX_NAME in existing_indexes:
+    if index_exists(pc):
         print(f"Index '{INDEX_NAME}' already exists. Using existing index.")
-        return pc.Index(INDEX_NAME)
+        return pc.Index(INDEX_NAME, pool_threads=UPSERT_POOL_THREADS)
     
     print(f"Creating new index '{INDEX_NAME}'...")
     pc.create_index(
@@ -58,39 +70,22 @@ def create_index(pc: Pinecone):
     
     # Wait for index to be ready
     print("Waiting for index to be ready...")
-    import time
-    while INDEX_NAME not in [index.name for index in pc.list_indexes()]:
-        time.sleep(1)
+    while not pc.describe_index(INDEX_NAME).status['ready']:
+        time.sleep(0.25)
     
-    return pc.Index(INDEX_NAME)
-
-
-def generate_embeddings(texts):
-    """Generate embeddings using OpenAI's text-embedding-ada-002 model."""
-    print("Generating embeddings...")
-    embeddings = []
-    for text in texts:
-        response = openai_client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
-        )
-        embeddings.append(response.data[0].embedding)
-    return embeddings
+    return pc.Index(INDEX_NAME, pool_threads=UPSERT_POOL_THREADS)
 
 
-def insert_embeddings(index, articles, embeddings):
-    """Insert embeddings into Pinecone index."""
+def insert_embeddings(index, embeddings):
+    """Insert article embeddings into Pinecone index."""
     print("Inserting embeddings into Pinecone...")
-    vectors = []
-    for i, (article, embedding) in enumerate(zip(articles, embeddings)):
-        vectors.append({
-            "id": f"article-{i}",
-            "values": embedding,
-            "metadata": {"text": article}
-        })
+    vectors = [
+        {"id": id_, "values": e.tolist(), "metadata": {"text": a}}
+        for id_, a, e in zip(ARTICLE_IDS, ARTICLES, embeddings)
+    ]
     
     # Insert in batches
-    index.upsert(vectors=vectors)
+    upsert_in_batches(index, vectors)
     print(f"Successfully inserted {len(vectors)} vectors.")
 
 
@@ -99,11 +94,11 @@ def query_index(index, query_text, top_k=3):
     print(f"\nQuerying: '{query_text}'")
     
     # Generate embedding for the query
-    query_embedding = generate_embeddings([query_text])[0]
+    query_embedding = generate_embeddings(openai_client, [query_text])[0]
     
     # Query Pinecone
     results = index.query(
-        vector=query_embedding,
+        vector=query_embedding.tolist(),
         top_k=top_k,
         include_metadata=True
     )
@@ -144,16 +139,18 @@ def main():
         # Create index
         index = create_index(pc)
         
-        # Generate embeddings
-        embeddings = generate_embeddings(ARTICLES)
+        # Load precomputed or cached embeddings, falling back to OpenAI
+        print("Preparing article embeddings...")
+        embeddings = embed_articles(lambda texts: asyncio.run(
+            embed_texts_async(openai_client.api_key, texts)
+        ))
         
         # Insert embeddings
-        insert_embeddings(index, ARTICLES, embeddings)
+        insert_embeddings(index, embeddings)
         
-        # Wait a moment for indexing to complete
-        import time
+        # Wait for indexing to complete
         print("\nWaiting for vectors to be indexed...")
-        time.sleep(2)
+        wait_for_vectors(index, len(ARTICLES))
         
         # Query the index
         query = "What is the future of AI?"
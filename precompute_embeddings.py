@@ -0,0 +1,43 @@
+"""
+Precompute Article Embeddings
+One-shot script that embeds ARTICLES and writes them to article_embeddings.npz,
+so the main script and Streamlit app can skip the OpenAI call at startup.
+"""
+
+import asyncio
+import os
+import numpy as np
+from dotenv import load_dotenv
+from vector_db import (
+    ARTICLE_EMBEDDINGS_PATH,
+    ARTICLE_IDS,
+    ARTICLES,
+    articles_hash,
+    embed_texts_async,
+    embed_with_disk_cache,
+)
+
+# Load environment variables
+load_dotenv()
+
+
+def precompute_embeddings():
+    """Embed ARTICLES and save them with a hash for invalidation."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+    embeddings = embed_with_disk_cache(
+        ARTICLES, lambda texts: asyncio.run(embed_texts_async(api_key, texts))
+    )
+    np.savez(
+        ARTICLE_EMBEDDINGS_PATH,
+        ids=np.array(ARTICLE_IDS),
+        embeddings=np.vstack(embeddings).astype(np.float32),
+        articles_sha256=np.array(articles_hash())
+    )
+    print(f"Saved {len(embeddings)} embeddings to {ARTICLE_EMBEDDINGS_PATH}")
+
+
+if __name__ == "__main__":
+    precompute_embeddings()
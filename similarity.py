@@ -0,0 +1,57 @@
+"""
+Cosine Similarity Kernels
+Top-k cosine search over a row-normalized embedding matrix, specialized for
+DIMENSION-wide vectors with Numba when it is installed.
+"""
+
+import numpy as np
+from vector_db import DIMENSION
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _cosine_topk_numpy(matrix, q, k):
+    """Score all rows with a matmul and select the top k with argpartition."""
+    q = q / np.linalg.norm(q)
+    scores = matrix @ q
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+if numba is not None:
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _cosine_topk_numba(matrix, q, k):
+        """Score rows in parallel with a fixed-width dot product and return the top k."""
+        norm = 0.0
+        for j in range(DIMENSION):
+            norm += q[j] * q[j]
+        inv_norm = 1.0 / np.sqrt(norm)
+        
+        n = matrix.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        for i in numba.prange(n):
+            acc = np.float32(0.0)
+            for j in range(DIMENSION):
+                acc += matrix[i, j] * q[j]
+            scores[i] = acc * inv_norm
+        
+        top = np.argsort(-scores)[:k]
+        return top, scores[top]
+    
+    # Compile once at import so the first query doesn't pay for it
+    _cosine_topk_numba(
+        np.zeros((1, DIMENSION), dtype=np.float32), np.ones(DIMENSION, dtype=np.float32), 1
+    )
+
+
+def cosine_topk(matrix, q, k):
+    """Return row indices and cosine scores of the k rows closest to q."""
+    k = min(k, matrix.shape[0])
+    q = np.ascontiguousarray(q, dtype=np.float32)
+    if numba is not None and matrix.shape[1] == DIMENSION:
+        return _cosine_topk_numba(matrix, q, k)
+    return _cosine_topk_numpy(matrix, q, k)
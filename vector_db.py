@@ -0,0 +1,217 @@
+"""
+Shared Pinecone Vector Database Helpers
+Constants, embedding generation and index helpers used by both the
+command-line script and the Streamlit app.
+"""
+
+import asyncio
+import dbm
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import shelve
+import threading
+import time
+from itertools import islice
+from typing import Tuple
+import httpx
+import numpy as np
+from openai import AsyncOpenAI, RateLimitError
+
+# Prefer the gRPC client (protobuf over HTTP/2); it ships with current SDKs and
+# needed the grpc extra on older ones
+try:
+    from pinecone.grpc import PineconeGRPC as Pinecone
+except ImportError:
+    from pinecone import Pinecone
+
+# Articles to be embedded
+ARTICLES: Tuple[str, ...] = (
+    "AI is revolutionizing industries by enabling automation and improving efficiency.",
+    "Quantum computing promises to solve complex problems that classical computers cannot.",
+    "The future of blockchain technology includes decentralized finance and enhanced security."
+)
+ARTICLE_IDS: Tuple[str, ...] = tuple(f"article-{i}" for i in range(len(ARTICLES)))
+
+INDEX_NAME = "article-index"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+DIMENSION = 1536  # OpenAI text-embedding-ada-002 dimension
+METRIC = "cosine"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_CACHE_PATH = os.path.join(BASE_DIR, ".embeddings")
+ARTICLE_EMBEDDINGS_PATH = os.path.join(BASE_DIR, "article_embeddings.npz")
+UPSERT_BATCH_SIZE = 100
+UPSERT_POOL_THREADS = 8
+HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+
+logger = logging.getLogger(__name__)
+
+# shelve is not safe for concurrent access, so every open goes through this lock
+_embedding_cache_lock = threading.Lock()
+# The lock is per process: another process holding the dbm (a gdbm lock error)
+# or a torn write surfaces as one of these, and the cache is skipped
+_EMBEDDING_CACHE_ERRORS = (*dbm.error, EOFError, SyntaxError, ValueError, pickle.UnpicklingError)
+
+
+def index_exists(pc: Pinecone):
+    """Check whether the index exists, preferring the cheap has_index call."""
+    if hasattr(pc, "has_index"):
+        return pc.has_index(INDEX_NAME)
+    return INDEX_NAME in [index.name for index in pc.list_indexes()]
+
+
+def wait_for_vectors(index, expected_count, timeout=10, interval=0.2):
+    """Poll index stats until the expected number of vectors is visible."""
+    deadline = time.monotonic() + timeout
+    while index.describe_index_stats().total_vector_count < expected_count:
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+
+
+def _embedding_cache_key(text):
+    """Build the on-disk cache key for a text under the current model."""
+    return f"{EMBEDDING_MODEL}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def load_cached_embeddings(texts):
+    """Return cached embeddings for texts, with None for cache misses."""
+    try:
+        with _embedding_cache_lock, shelve.open(EMBEDDING_CACHE_PATH) as cache:
+            cached = [cache.get(_embedding_cache_key(text)) for text in texts]
+    except _EMBEDDING_CACHE_ERRORS:
+        logger.warning("Embedding cache unavailable, embedding all texts", exc_info=True)
+        return [None] * len(texts)
+    return [None if e is None else np.asarray(e, dtype=np.float32) for e in cached]
+
+
+def store_cached_embeddings(texts, embeddings):
+    """Write embeddings to the on-disk cache, skipping it if unavailable."""
+    try:
+        with _embedding_cache_lock, shelve.open(EMBEDDING_CACHE_PATH) as cache:
+            for text, embedding in zip(texts, embeddings):
+                cache[_embedding_cache_key(text)] = embedding
+    except _EMBEDDING_CACHE_ERRORS:
+        logger.warning("Embedding cache unavailable, not storing embeddings", exc_info=True)
+
+
+def embed_with_disk_cache(texts, embed):
+    """Embed texts through the on-disk cache, calling embed only for cache misses."""
+    embeddings = load_cached_embeddings(texts)
+    misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if misses:
+        miss_texts = [texts[i] for i in misses]
+        fresh = embed(miss_texts)
+        store_cached_embeddings(miss_texts, fresh)
+        for i, embedding in zip(misses, fresh):
+            embeddings[i] = embedding
+    return embeddings
+
+
+def generate_embeddings(client, texts):
+    """Generate embeddings using OpenAI in a single batched request."""
+    response = client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=list(texts)
+    )
+    return [
+        np.asarray(d.embedding, dtype=np.float32)
+        for d in sorted(response.data, key=lambda d: d.index)
+    ]
+
+
+async def generate_embeddings_async(client, texts, batch_size=256, max_concurrency=5, max_retries=5):
+    """Generate embeddings in concurrent batches using the async OpenAI client."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    batches = [list(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+
+    async def embed_batch(batch):
+        async with semaphore:
+            for attempt in range(max_retries):
+                try:
+                    response = await client.embeddings.create(
+                        model=EMBEDDING_MODEL,
+                        input=batch
+                    )
+                    return [
+                        np.asarray(d.embedding, dtype=np.float32)
+                        for d in sorted(response.data, key=lambda d: d.index)
+                    ]
+                except RateLimitError:
+                    if attempt == max_retries - 1:
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [embedding for batch in results for embedding in batch]
+
+
+async def embed_texts_async(api_key, texts):
+    """Embed texts with a pooled HTTP/2 async client that is closed before returning."""
+    async with AsyncOpenAI(
+        api_key=api_key,
+        http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
+    ) as client:
+        return await generate_embeddings_async(client, texts)
+
+
+def articles_hash():
+    """Fingerprint ARTICLES and the embedding model for artifact invalidation."""
+    return hashlib.sha256(repr((EMBEDDING_MODEL, list(ARTICLES))).encode("utf-8")).hexdigest()
+
+
+def load_precomputed_embeddings():
+    """Load article embeddings from the precomputed artifact, or None if missing or stale."""
+    if not os.path.exists(ARTICLE_EMBEDDINGS_PATH):
+        return None
+    with np.load(ARTICLE_EMBEDDINGS_PATH) as data:
+        if str(data["articles_sha256"]) != articles_hash():
+            return None
+        return list(data["embeddings"])
+
+
+def embed_articles(embed):
+    """Return ARTICLES embeddings from the artifact, the disk cache, or embed."""
+    embeddings = load_precomputed_embeddings()
+    if embeddings is None:
+        embeddings = embed_with_disk_cache(ARTICLES, embed)
+    return embeddings
+
+
+def chunks(iterable, n):
+    """Yield successive lists of at most n items from iterable."""
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+def upsert_in_batches(index, vectors, batch_size=UPSERT_BATCH_SIZE):
+    """Upsert vectors in concurrent batches of at most batch_size."""
+    batches = list(chunks(vectors, batch_size))
+    
+    # gRPC index: one future per batch from upsert_async
+    if hasattr(index, "upsert_async"):
+        futures = [index.upsert_async(vectors=batch) for batch in batches]
+        for future in futures:
+            future.result(timeout=None)
+        return
+    
+    # Newer REST index: the SDK batches and parallelizes the upsert itself
+    if "max_concurrency" in inspect.signature(index.upsert).parameters:
+        index.upsert(
+            vectors=vectors,
+            batch_size=batch_size,
+            max_concurrency=UPSERT_POOL_THREADS,
+            show_progress=False
+        )
+        return
+    
+    # Older SDKs: async_req returns a future per batch (result() on gRPC, get() on REST)
+    futures = [index.upsert(vectors=batch, async_req=True) for batch in batches]
+    for future in futures:
+        if hasattr(future, "result"):
+            future.result()
+        else:
+            future.get()